@@ -1,12 +1,32 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for
+from flask import Flask, request, jsonify, render_template, redirect, url_for, send_from_directory, Response
 import json
 import random
 import time
 from datetime import datetime, timedelta
 import threading
 import os
+from dataclasses import dataclass
 
-app = Flask(__name__)
+# No built-in static route: send_static below serves /static with its own Cache-Control
+app = Flask(__name__, static_folder=None)
+
+# Let browsers cache static assets (logo/CSS) and revalidate with If-None-Match
+STATIC_MAX_AGE = 86400
+
+# Device record reported by an ESP32 on each poll
+@dataclass(slots=True)
+class Device:
+    id: str
+    ip: str
+    rssi: int
+    role: str
+    status: str
+    health: int
+    battery: int
+    comment: str
+    last_updated: float
+
+DEVICE_FIELDS = ('id', 'ip', 'rssi', 'role', 'status', 'health', 'battery', 'comment')
 
 # In-memory storage for device data
 devices = {}
@@ -23,6 +43,44 @@ game_state = {
 # Lock for thread-safe device updates
 devices_lock = threading.Lock()
 
+def evict_stale_devices():
+    """Drop devices silent for more than two game timeouts (caller holds devices_lock)"""
+    # players stop polling once they have a role, so nothing is evicted mid-game
+    if game_state['status'] == 'game':
+        return
+    cutoff = time.time() - 2 * max(1, game_state['game_timeout'])
+    for dev_id in [dev_id for dev_id, device in devices.items() if device.last_updated < cutoff]:
+        del devices[dev_id]
+
+def stale_device_sweeper():
+    """Background loop evicting stale devices once per game timeout"""
+    while True:
+        # clamped: the timeout comes from the /prepare form and may be 0 or negative
+        time.sleep(max(1, game_state['game_timeout']))
+        with devices_lock:
+            evict_stale_devices()
+
+threading.Thread(target=stale_device_sweeper, daemon=True).start()
+
+# Serialized /api/device reply keyed by the game_state fields it depends on;
+# only the role differs between devices
+ROLE_PLACEHOLDER = b'"__R__"'
+_device_response_cache = (None, b'')
+
+def device_response_template():
+    global _device_response_cache
+    key = (game_state['status'], game_state['game_timeout'], game_state['game_duration'])
+    cached_key, cached_body = _device_response_cache
+    if cached_key != key:
+        cached_body = json.dumps({
+            'role': '__R__',
+            'status': key[0],
+            'game_timeout': key[1],
+            'game_duration': key[2]
+        }).encode()
+        _device_response_cache = (key, cached_body)
+    return cached_body
+
 # Handle GET requests from devices
 @app.route('/api/device', methods=['GET'])
 def device_update():
@@ -36,37 +94,25 @@ def device_update():
     except json.JSONDecodeError:
         return jsonify({'error': 'Invalid JSON format'}), 400
 
-    if not all(key in data for key in ['id', 'ip', 'rssi', 'role', 'status', 'health', 'battery', 'comment']):
+    if not all(key in data for key in DEVICE_FIELDS):
         return jsonify({'error': 'Missing required fields'}), 400
 
+    device = Device(**{key: data[key] for key in DEVICE_FIELDS}, last_updated=time.time())
     with devices_lock:
-        devices[data['id']] = {
-            'id': data['id'],
-            'ip': data['ip'],
-            'rssi': data['rssi'],
-            'role': data['role'],
-            'status': data['status'],
-            'health': data['health'],
-            'battery': data['battery'],
-            'comment': data['comment'],
-            'last_updated': time.time()
-        }
-
-    response = {
-        'role': 'neutral' if game_state['status'] == 'sleep' else devices[data['id']]['role'],
-        'status': game_state['status'],
-        'game_timeout': game_state['game_timeout'],
-        'game_duration': game_state['game_duration']
-    }
-    return jsonify(response)
+        devices[device.id] = device
+
+    role = 'neutral' if game_state['status'] == 'sleep' else device.role
+    body = device_response_template().replace(ROLE_PLACEHOLDER, json.dumps(role).encode())
+    return Response(body, mimetype='application/json')
 
 # Main screen (2.1)
 @app.route('/')
 def main_screen():
     with devices_lock:
         game_state['status'] = 'sleep'
+        evict_stale_devices()
         for device in devices.values():
-            device['status'] = 'sleep'
+            device.status = 'sleep'
     return render_template('main.html')
 
 # Preparation screen (2.2)
@@ -123,8 +169,8 @@ def prepare_screen():
     with devices_lock:
         game_state['status'] = 'prepare'
         for device in devices.values():
-            device['status'] = 'prepare'
-        sorted_devices = sorted(devices.values(), key=lambda x: x['id'])
+            device.status = 'prepare'
+        sorted_devices = sorted(devices.values(), key=lambda x: x.id)
     return render_template('prepare.html', devices=sorted_devices, game_state=game_state)
 
 
@@ -134,15 +180,16 @@ def end_screen():
     with devices_lock:
         game_state['status'] = 'end'
         for device in devices.values():
-            device['status'] = 'end'
-        humans = [devices[dev_id] for dev_id in game_state['humans']]
-        zombies = [devices[dev_id] for dev_id in game_state['zombies']]
+            device.status = 'end'
+        # Devices may have been evicted by the stale sweep since the game started
+        humans = [devices[dev_id] for dev_id in game_state['humans'] if dev_id in devices]
+        zombies = [devices[dev_id] for dev_id in game_state['zombies'] if dev_id in devices]
     return render_template('end.html', humans=humans, zombies=zombies)
 
 # Static files (logo)
 @app.route('/static/<path:path>')
 def send_static(path):
-    return send_from_directory('static', path)
+    return send_from_directory('static', path, conditional=True, max_age=STATIC_MAX_AGE)
 
 # Templates
 @app.route('/templates/<path:path>')
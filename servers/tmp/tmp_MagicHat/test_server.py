@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('flask')
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    # server.py creates static/ and templates/ in the working directory on import
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(os.path.dirname(os.path.abspath(__file__)))
+    sys.modules.pop('server', None)
+    import server
+    return server
+
+
+def add_silent_device(server, dev_id):
+    server.devices[dev_id] = server.Device(
+        id=dev_id, ip='10.0.0.2', rssi=-60, role='human', status='game',
+        health=100, battery=90, comment='', last_updated=0.0)
+
+
+def test_players_are_not_evicted_during_game(server):
+    add_silent_device(server, 'dev1')
+    server.game_state['status'] = 'game'
+    server.evict_stale_devices()
+    assert 'dev1' in server.devices
+
+
+def test_silent_devices_are_evicted_outside_game(server):
+    add_silent_device(server, 'dev1')
+    server.game_state['status'] = 'sleep'
+    server.evict_stale_devices()
+    assert 'dev1' not in server.devices
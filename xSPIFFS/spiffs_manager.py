@@ -4,13 +4,19 @@ ESP32 SPIFFS Manager
 Combines upload and download functionality for ESP32 SPIFFS filesystem
 """
 
+import argparse
 import os
 import subprocess
 import sys
 import shutil
+from collections import deque
 from pathlib import Path
 import serial.tools.list_ports
 
+# Output lines kept for error reporting and stdout flush batching
+OUTPUT_TAIL_LINES = 1024
+FLUSH_EVERY_LINES = 64
+
 def run_command(cmd, check=True):
     """Run a command and display real-time output"""
     print(f"Running: {' '.join(cmd)}")
@@ -27,15 +33,23 @@ def run_command(cmd, check=True):
             universal_newlines=True
         )
         
-        # Display output in real-time
-        output_lines = []
+        # Display output in real-time, flushing in batches to keep up with
+        # esptool progress output
+        output_lines = deque(maxlen=OUTPUT_TAIL_LINES)
+        write = sys.stdout.write
+        pending = 0
         while True:
             output = process.stdout.readline()
             if output == '' and process.poll() is not None:
                 break
             if output:
-                print(output.strip())
-                output_lines.append(output.strip())
+                write(output)
+                output_lines.append(output)
+                pending += 1
+                if pending >= FLUSH_EVERY_LINES:
+                    sys.stdout.flush()
+                    pending = 0
+        sys.stdout.flush()
         
         # Wait for process to complete
         return_code = process.poll()
@@ -54,14 +68,13 @@ def run_command(cmd, check=True):
         print("Make sure the required tools are in your PATH or current directory")
         raise
 
+REQUIRED_FILES = ("esptool.exe", "mkspiffs_espressif32_arduino.exe")
+
 def check_required_files():
     """Check if required executables exist"""
-    required_files = ["esptool.exe", "mkspiffs_espressif32_arduino.exe"]
-    missing_files = []
-    
-    for file in required_files:
-        if not os.path.exists(file):
-            missing_files.append(file)
+    # One directory listing instead of an existence probe per file
+    names = {entry.name for entry in os.scandir('.')}
+    missing_files = [f for f in REQUIRED_FILES if f not in names and shutil.which(f) is None]
     
     if missing_files:
         print("Missing required files:")
@@ -221,30 +234,75 @@ def upload_spiffs(com_port):
     print("SPIFFS upload completed successfully!")
     return True
 
+def parse_args(argv=None):
+    """Parse command line options for non-interactive use"""
+    parser = argparse.ArgumentParser(description="ESP32 SPIFFS Manager")
+    parser.add_argument("--action", choices=["download", "upload"],
+                        help="Operation to perform without the menu prompt")
+    parser.add_argument("--port",
+                        help="COM port(s) to use, comma separated (e.g. COM15,COM16); upload only for more than one")
+    return parser.parse_args(argv)
+
+def run_batch(action, ports):
+    """Run one operation on each port in turn without prompting"""
+    if action == 'download' and len(ports) > 1:
+        # every download overwrites data/ and partition-table.bin
+        print("Error: download supports a single port only")
+        return False
+    for com_port in ports:
+        print(f"\n=== {com_port} ===")
+        if action == 'download':
+            download_spiffs(com_port)
+        elif not upload_spiffs(com_port):
+            return False
+    print("\nOperation completed!")
+    return True
+
 def main():
     """Main function"""
+    args = parse_args()
+    ports = [p.strip().upper() for p in args.port.split(",") if p.strip()] if args.port else []
+    batch = bool(args.action and ports)
+    
     print("ESP32 SPIFFS Manager")
     print("===================")
     
     # Check for required dependencies
     if not check_pyserial():
-        input("\nPress Enter to exit...")
+        if not batch:
+            input("\nPress Enter to exit...")
         sys.exit(1)
     
     # Check for required files
     if not check_required_files():
-        input("\nPress Enter to exit...")
+        if not batch:
+            input("\nPress Enter to exit...")
         sys.exit(1)
     
+    # Both action and port given: run unattended and exit with a status code
+    if batch:
+        try:
+            ok = run_batch(args.action, ports)
+        except KeyboardInterrupt:
+            print("\n\nOperation cancelled by user")
+            sys.exit(1)
+        except Exception as e:
+            print(f"\nAn error occurred: {e}")
+            sys.exit(1)
+        sys.exit(0 if ok else 1)
+    
     try:
         while True:
-            choice = get_user_choice()
+            if args.action:
+                choice = '1' if args.action == 'download' else '2'
+            else:
+                choice = get_user_choice()
             
             if choice == '3':
                 print("Exiting...")
                 break
             
-            com_port = get_com_port()
+            com_port = ports[0] if ports else get_com_port()
             
             if choice == '1':
                 download_spiffs(com_port)
@@ -3,19 +3,167 @@
 ESP32 SPIFFS Manager GUI
 Windows GUI application for managing ESP32 SPIFFS filesystem
 """
-VERSION = "v.027"  #  <── incremented on every program update
+VERSION = "v.089"  #  <── incremented on every program update
 
 import os
+import shutil
 import json
 import subprocess
 import sys
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
 import csv
+import codecs
+import hashlib
+import struct
+import zlib
 from pathlib import Path
-import serial.tools.list_ports
+try:
+    from serial.tools.list_ports import comports   # bound once, called on every scan
+    HAVE_PYSERIAL = True
+except ImportError:                     # reported by check_dependencies()
+    comports = None
+    HAVE_PYSERIAL = False
 import threading
+from concurrent.futures import ThreadPoolExecutor
+import re
+import time
 from datetime import datetime
+from collections import OrderedDict, deque
+
+# External tools expected next to the script (flash access goes through the esptool package)
+MKSPIFFS_EXE = "mkspiffs_espressif32_arduino.exe"
+REQUIRED_FILES = (MKSPIFFS_EXE,)
+
+# Keep Windows from flashing a console window for every tool run
+if sys.platform == "win32":
+    _startupinfo = subprocess.STARTUPINFO()
+    _startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    _startupinfo.wShowWindow = 0        # SW_HIDE
+    SUBPROCESS_KWARGS = {"startupinfo": _startupinfo,
+                         "creationflags": subprocess.CREATE_NO_WINDOW}
+else:
+    SUBPROCESS_KWARGS = {}
+
+
+def resolve_tool(name):
+    """Absolute path of a tool: the local copy if present, else the one on PATH."""
+    if os.path.isfile(name):
+        return os.path.abspath(name)
+    return shutil.which(name) or name
+
+def write_file_bytes(path, data):
+    """Write bytes to path with raw os.write calls (no TextIOWrapper/buffer copy).
+    Returns the os.stat_result of the written file."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        return os.fstat(fd)
+    finally:
+        os.close(fd)
+
+def replace_file_bytes(path, data):
+    """Write data to a temp file next to path and rename it over path, so a
+    failed write never leaves a truncated file. Returns the new file's stat."""
+    tmp_path = f"{path}.tmp"
+    try:
+        st = write_file_bytes(tmp_path, data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        # don't leave the temp file behind (it would end up in the SPIFFS image)
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return st
+
+# Number of opened file contents kept in memory
+FILE_CACHE_SIZE = 16
+# ... and their total size in characters (the newest entry is always kept)
+FILE_CACHE_MAX_CHARS = 16 * 1024 * 1024
+
+# Delay that coalesces bursts of config changes into one write
+CONFIG_SAVE_DELAY_MS = 500
+
+# Seconds a COM port scan result is reused by repeated Scan clicks
+PORT_SCAN_CACHE_SEC = 2.0
+
+# How often the Tk thread checks whether a background port scan has finished
+PORT_SCAN_POLL_MS = 50
+
+# USB-serial bridges found on ESP32 boards: CP210x, CH340/CH9102, FTDI;
+# any port with Espressif's own VID (native USB-CDC / JTAG) counts as well
+ESP_USB_VID = 0x303A
+ESP_USB_IDS = frozenset({(0x10C4, 0xEA60), (0x1A86, 0x7523), (0x1A86, 0x55D4),
+                         (0x0403, 0x6001), (0x0403, 0x6010), (0x0403, 0x6015)})
+
+def is_esp_port(port):
+    return port.vid == ESP_USB_VID or (port.vid, port.pid) in ESP_USB_IDS
+
+# esptool progress lines look like "Writing at 0x00010000... (25 %)"
+PROGRESS_RE = re.compile(r'\((\d+)\s*%\)')
+
+# Step interval of the indeterminate progress animation (Tk default is 50 ms)
+PROGRESS_INTERVAL_MS = 200
+
+# Default esptool baud rate; while it is left unchanged, chips below get a faster
+# rate tried first (checked on each connect, then remembered per port and chip)
+DEFAULT_BAUD_RATE = "921600"
+FAST_BAUD_RATES = {
+    'esp32-s2': 1500000,
+    'esp32-s3': 2000000,
+    'esp32-c6': 2000000,
+    'esp32-p4': 2000000,
+}
+
+# One 32-byte partition table entry: magic, type, subtype, offset, size, name, flags
+PARTITION_ENTRY = struct.Struct('<HBBII16sI')
+PARTITION_MAGIC = 0x50AA                  # bytes AA 50
+PARTITION_END_MARKERS = (0xFFFF, 0x0000)  # erased flash / empty entry
+
+# Partition type / subtype names, by type byte
+PARTITION_TYPES = {
+    0x00: 'app',
+    0x01: 'data',
+}
+PARTITION_SUBTYPES = {
+    0x00: {  # app
+        0x00: 'factory',
+        0x10: 'ota_0',
+        0x11: 'ota_1',
+        0x12: 'ota_2',
+        0x13: 'ota_3',
+        0x20: 'test',
+    },
+    0x01: {  # data
+        0x00: 'ota',
+        0x01: 'phy',
+        0x02: 'nvs',
+        0x03: 'coredump',
+        0x04: 'nvs_keys',
+        0x05: 'efuse',
+        0x80: 'esphttpd',
+        0x81: 'fat',
+        0x82: 'spiffs',
+    },
+}
+# Lines of tool output kept for error messages
+TOOL_OUTPUT_TAIL_LINES = 64
+
+# Undo steps kept by the editor (reset whenever another file is loaded)
+EDITOR_MAX_UNDO = 200
+
+# Bytes inspected to tell text from binary content
+TEXT_SNIFF_BYTES = 512
+
+# Extensions that are editable in the text editor (tuple: passed straight to str.endswith)
+TEXT_EXTENSIONS = ('.json', '.txt', '.ini', '.cfg', '.conf', '.log', '.csv')
+
+# Characters outside the BMP; Tk text indices count each of them as two chars
+NON_BMP_RE = re.compile('[\U00010000-\U0010FFFF]')
 
 # ------------------------------------------------------------------
 #  Main application class
@@ -27,8 +175,12 @@ class ESP32SPIFFSManager:
         self.root.geometry("1000x700")
         self.root.minsize(800, 600)
 
+        # External tools, resolved once instead of on every launch
+        self.mkspiffs_exe = resolve_tool(MKSPIFFS_EXE)
+
         # Configuration
         self.config_file = "spiffs_config.json"
+        self.config_save_job = None      # pending root.after id of a debounced save
         self.load_config()
 
         # keep chip variable even though the UI element is hidden
@@ -37,24 +189,35 @@ class ESP32SPIFFSManager:
         # --------------------------------------------------------------
         #  SPIFFS partition information (now loaded from ESP32)
         # --------------------------------------------------------------
-        self.spiffs_partitions = []          # list of dicts: {name, offset, size}
+        self.spiffs_partitions = []          # list of dicts: {name, offset, size, offset_hex, size_hex, label}
         self.current_spiffs_index = 0       # index inside self.spiffs_partitions
 
         # State variables
         self.connected = False
-        self.current_files = {}       # filename → content (text content or empty for non‑text)
+        self.current_files = {}       # filename → (size, mtime_ns); content is read on demand
+        self.file_cache = OrderedDict()  # filename → content, LRU of recently opened files
+        self.sniff_cache = {}         # filename → (mtime_ns, looks like text)
+        self.file_index = {}          # filename → row in file_listbox
         self.selected_file = None     # filename currently in editor
         self.spiffs_downloaded = False
-        self.editor_modified = False  # True while editor has unsaved changes
-
-        # Define which extensions are editable in the text editor
-        self.text_extensions = {
-            '.json', '.txt', '.ini', '.cfg', '.conf', '.log', '.csv'
-        }
+        # one reusable worker thread for download/upload jobs
+        self.io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spiffs-io")
+        self.uploading = False        # flash write in progress (set/cleared on the Tk thread)
+        self.close_pending = False    # window close deferred until the upload finishes
+        self.ports_cache = (0.0, None)   # (monotonic time, {device: display}) of last scan
+        self.shown_ports = None          # {device: display} currently in port_combo
+        self.esp = None               # esptool stub connection, kept open while connected
+        self.esp_port = ""            # port picked when Connect was pressed; open_esp() uses it
+        self.partition_cache = {}     # (port, chip description) → (table MD5, SPIFFS partitions)
+        self.selected_device = ""     # device part of port_var, kept in sync by on_port_changed
 
         # Create GUI
+        self.content_built = False    # file list / editor created lazily
         self.create_widgets()
         self.scan_ports()
+        # load esptool while the user picks a port; open_esp's import then
+        # finds it in sys.modules (or waits on the import lock if still loading)
+        threading.Thread(target=self.preload_esptool, daemon=True).start()
 
         # Ask on unsaved changes when user closes window
         self.root.protocol("WM_DELETE_WINDOW", self.on_app_closing)
@@ -67,7 +230,8 @@ class ESP32SPIFFSManager:
     # ------------------------------------------------------------------
     def ask_unsaved_changes(self, action: str = "switch file"):
         """Return True if the caller may continue, False if user chose Cancel."""
-        if not self.editor_modified:
+        # Tk's modified flag on the editor is the single source of truth
+        if not self.selected_file or not self.content_editor.edit_modified():
             return True
 
         answer = messagebox.askyesnocancel(
@@ -99,28 +263,43 @@ class ESP32SPIFFSManager:
             "spiffs_offset": 6750208,  # 0x670000
             "spiffs_size": 1572864,    # 0x180000
             "esp32_chip": "esp32-s3",
-            "baud_rate": "921600",
-            "last_port": ""
+            "baud_rate": DEFAULT_BAUD_RATE,
+            "last_port": "",
+            "link_baud_rates": {}      # "port/chip" → baud rate that worked (or fell back to)
         }
+        self.config_serialized = None    # last JSON text read from / written to disk
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    self.config = json.load(f)
-                for key, value in default_config.items():
-                    if key not in self.config:
-                        self.config[key] = value
-            else:
-                self.config = default_config
-                self.save_config()
+            with open(self.config_file, 'r') as f:
+                self.config_serialized = f.read()
+            # defaults first, stored values override them (one merge, missing keys filled in)
+            self.config = {**default_config, **json.loads(self.config_serialized)}
+            # numeric fields may be stored as hex strings – parse them once here
+            for key in ("spiffs_offset", "spiffs_size"):
+                self.config[key] = self._ensure_int(self.config[key])
+        except FileNotFoundError:
+            self.config = default_config
+            self.save_config()
         except Exception as e:
             print(f"Error loading config: {e}")
             self.config = default_config
             self.save_config()
 
     def save_config(self):
+        """Schedule a config write; changes made within CONFIG_SAVE_DELAY_MS share one write."""
+        if self.config_save_job is None:
+            self.config_save_job = self.root.after(CONFIG_SAVE_DELAY_MS, self.flush_config)
+
+    def flush_config(self):
+        """Write the config now (if it changed) and drop any pending debounced save."""
+        if self.config_save_job is not None:
+            self.root.after_cancel(self.config_save_job)
+            self.config_save_job = None
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=4)
+            serialized = json.dumps(self.config, indent=4)
+            if serialized == self.config_serialized:
+                return                          # nothing changed on disk
+            replace_file_bytes(self.config_file, serialized.encode('utf-8'))
+            self.config_serialized = serialized
         except Exception as e:
             print(f"Error saving config: {e}")
 
@@ -148,45 +327,124 @@ class ESP32SPIFFSManager:
     # ------------------------------------------------------------------
     #  NEW:  Read partition table from ESP32
     # ------------------------------------------------------------------
-    def read_partition_table_from_esp32(self):
-        """Read and parse partition table from connected ESP32"""
-        esp = None
+    @staticmethod
+    def preload_esptool():
         try:
-            import esptool
+            import esptool  # noqa: F401
+        except ImportError:
+            pass            # reported on Connect by read_partition_table_from_esp32
 
-            port = self.get_selected_port()
-            if not port:
-                raise Exception("No COM port selected")
+    def open_esp(self):
+        """Return the open esptool connection, connecting and loading the stub on
+        first use. The serial port stays open until close_esp()."""
+        if self.esp is not None:
+            return self.esp
+
+        import esptool
 
-            print(f"Connecting to ESP32 on port {port}...")
+        port = self.esp_port
+        if not port:
+            raise Exception("No COM port selected")
 
-            # Connect to ESP32
-            esp = esptool.get_default_connected_device(
-                serial_list=[port],
-                port=port,
-                connect_attempts=7,
-                initial_baud=115200
-            )
+        print(f"Connecting to ESP32 on port {port}...")
 
-            if not esp:
-                raise Exception("Failed to connect to ESP32")
+        # Connect to ESP32
+        esp = esptool.get_default_connected_device(
+            serial_list=[port],
+            port=port,
+            connect_attempts=7,
+            initial_baud=115200
+        )
 
-            # Detect chip model and extract base chip type
+        if not esp:
+            raise Exception("Failed to connect to ESP32")
+
+        try:
+            esp = esp.run_stub()
+            # native USB (USB-Serial/JTAG, USB-OTG CDC) runs at full USB speed whatever
+            # the baud rate; only a UART bridge benefits from raising it
+            native_usb = any(getattr(esp, probe, lambda: False)()
+                             for probe in ("uses_usb_jtag_serial", "uses_usb_otg"))
+            link = f"{port}/{esp.CHIP_NAME.lower()}"
+            baud = self.select_baud(link, esp.CHIP_NAME.lower())
+            if baud > esp.ESP_ROM_BAUD and not native_usb:
+                if baud == int(self.config["baud_rate"]):
+                    esp.change_baud(baud)
+                elif not self.try_baud(esp, link, baud):
+                    # the bridge can't keep up and the stub may already be on the new
+                    # rate, so start over at the configured rate
+                    esp._port.close()
+                    return self.open_esp()
+            # tell the stub the real flash size so partitions above 4MB are reachable
+            flash_size = esptool.cmds.detect_flash_size(esp)
+            if flash_size is not None:
+                esp.flash_set_parameters(esptool.util.flash_size_bytes(flash_size))
+        except Exception:
+            esp._port.close()
+            raise
+
+        self.esp = esp
+        return esp
+
+    def select_baud(self, link, chip):
+        """Baud rate to use for link ("port/chip"); anything other than the
+        configured rate is probed by try_baud before it is trusted."""
+        configured = int(self.config["baud_rate"])
+        if self.config["baud_rate"] != DEFAULT_BAUD_RATE:
+            return configured                  # user's explicit choice wins
+        known = self.config["link_baud_rates"].get(link)
+        if known is not None:
+            return int(known)
+        return FAST_BAUD_RATES.get(chip, configured)
+
+    def try_baud(self, esp, link, baud):
+        """Switch to baud, probe the link and remember the outcome for it."""
+        try:
+            esp.change_baud(baud)
+            esp.read_reg(esp.CHIP_DETECT_MAGIC_REG_ADDR)
+        except Exception as e:
+            print(f"{baud} baud not usable ({e}), falling back to {self.config['baud_rate']}")
+            self.config["link_baud_rates"][link] = self.config["baud_rate"]
+            return False
+        self.config["link_baud_rates"][link] = str(baud)
+        return True
+
+    def close_esp(self):
+        """Release the serial port held by open_esp()."""
+        if self.esp is None:
+            return
+        try:
+            self.esp._port.close()
+            print("ESP32 connection closed successfully")
+        except Exception as e:
+            print(f"Error closing ESP32 connection: {e}")
+        self.esp = None
+
+    def read_partition_table_from_esp32(self):
+        """Read and parse partition table from connected ESP32.
+        Returns (chip description, SPIFFS partitions); touches no Tk state,
+        so it can run on a worker thread."""
+        try:
+            esp = self.open_esp()
+
+            # Detect chip model
             chip_description = esp.get_chip_description()
             print(f"Chip detected: {chip_description}")
-            chip_model = self.extract_chip_model(chip_description)
-            print(f"Extracted chip model: {chip_model}")
-            self.chip_var.set(chip_model)
-            self.config["esp32_chip"] = chip_model
-            self.save_config()
-            self.chip_display_var.set(chip_description)
 
             # Read partition table
             PARTITION_TABLE_OFFSET = 0x8000
             PARTITION_TABLE_SIZE = 0xC00  # 3KB
 
+            # on reconnect to the same board the chip hashes the table for us; only a
+            # changed table (e.g. after reflashing with a new layout) is read and parsed again
+            cache_key = (self.esp_port, chip_description)
+            table_md5 = esp.flash_md5sum(PARTITION_TABLE_OFFSET, PARTITION_TABLE_SIZE)
+            cached = self.partition_cache.get(cache_key)
+            if cached and cached[0] == table_md5:
+                print("Partition table unchanged since last connect, reusing parsed partitions")
+                return chip_description, cached[1]
+
             print(f"Reading partition table from offset 0x{PARTITION_TABLE_OFFSET:X}...")
-            esp = esp.run_stub()
             partition_data = esp.read_flash(PARTITION_TABLE_OFFSET, PARTITION_TABLE_SIZE)
             print(f"Successfully read {len(partition_data)} bytes of partition table")
 
@@ -194,37 +452,38 @@ class ESP32SPIFFSManager:
             partitions = self.parse_partition_table(partition_data)
             print(f"Parsed {len(partitions)} partitions from table")
 
-            # Filter only SPIFFS partitions
-            spiffs_partitions = []
-            for p in partitions:
-                if p['subtype'].lower() == 'spiffs':
-                    # Convert hex strings to integers
-                    offset = int(p['offset'], 0) if isinstance(p['offset'], str) else p['offset']
-                    size = int(p['size'], 0) if isinstance(p['size'], str) else p['size']
-                    spiffs_partitions.append({
-                        "name": p['name'],
-                        "offset": offset,
-                        "size": size
-                    })
-                    print(f"Found SPIFFS partition: {p['name']} at 0x{offset:X}, size 0x{size:X}")
+            # Filter only SPIFFS partitions (subtype names are already lower case);
+            # display/argv strings are formatted once here, not on every refresh
+            spiffs_partitions = [
+                self.make_spiffs_partition(p['name'], p['offset'], p['size'])
+                for p in partitions if p['subtype'] == 'spiffs'
+            ]
+            for p in spiffs_partitions:
+                print(f"Found SPIFFS partition: {p['name']} at {p['offset_hex']}, size {p['size_hex']}")
 
             if not spiffs_partitions:
                 raise Exception("No SPIFFS partitions found in partition table")
 
-            return spiffs_partitions
+            self.partition_cache[cache_key] = (table_md5, spiffs_partitions)
+            return chip_description, spiffs_partitions
 
         except ImportError:
             raise Exception("esptool library not found. Please install it: pip install esptool")
         except Exception as e:
+            self.close_esp()
             raise Exception(f"Failed to read partition table: {str(e)}")
-        finally:
-            # Ensure the connection is properly closed
-            if esp is not None:
-                try:
-                    esp._port.close()
-                    print("ESP32 connection closed successfully")
-                except Exception as e:
-                    print(f"Error closing ESP32 connection: {e}")
+
+    @staticmethod
+    def make_spiffs_partition(name, offset, size):
+        offset_hex = f"0x{offset:X}"
+        return {
+            "name": name,
+            "offset": offset,
+            "size": size,
+            "offset_hex": offset_hex,
+            "size_hex": f"0x{size:X}",
+            "label": f"{name} ({offset_hex}, {size} B)"
+        }
 
     def extract_chip_model(self, chip_description):
         """Extract base chip model from full chip description"""
@@ -245,32 +504,23 @@ class ESP32SPIFFSManager:
     def parse_partition_table(self, data):
         """Parse binary partition table data"""
         partitions = []
-        offset = 0
-
-        # MD5 hash is at the end, partition entries are 32 bytes each
-        while offset < len(data) - 32:
-            entry = data[offset:offset + 32]
 
+        # MD5 hash is at the end, partition entries are 32 bytes each;
+        # iter_unpack decodes every field of every entry in C
+        count = max(0, (len(data) - 1) // PARTITION_ENTRY.size)
+        entries = memoryview(data)[:count * PARTITION_ENTRY.size]
+        for magic, p_type, p_subtype, p_offset, p_size, name_bytes, flags in PARTITION_ENTRY.iter_unpack(entries):
             # Check for end marker (all 0xFF) or empty entry
-            if entry[0:2] == b'\xFF\xFF' or entry[0:2] == b'\x00\x00':
+            if magic in PARTITION_END_MARKERS:
                 break
 
             # Magic byte check (0xAA, 0x50)
-            if entry[0] != 0xAA or entry[1] != 0x50:
-                offset += 32
+            if magic != PARTITION_MAGIC:
                 continue
 
-            # Parse partition entry
-            p_type = entry[2]
-            p_subtype = entry[3]
-            p_offset = int.from_bytes(entry[4:8], 'little')
-            p_size = int.from_bytes(entry[8:12], 'little')
-
-            # Name is null‑terminated string
-            name_bytes = entry[12:28]
-            name = name_bytes.split(b'\x00')[0].decode('utf-8', errors='ignore')
-
-            flags = int.from_bytes(entry[28:32], 'little')
+            # Name is null‑terminated string (find: no list of chunks just to take the first)
+            end = name_bytes.find(b'\x00')
+            name = (name_bytes if end < 0 else name_bytes[:end]).decode('utf-8', errors='ignore')
 
             # Type and subtype mapping
             type_str = self.get_partition_type(p_type)
@@ -280,50 +530,22 @@ class ESP32SPIFFSManager:
                 'name': name,
                 'type': type_str,
                 'subtype': subtype_str,
-                'offset': f"0x{p_offset:X}",
-                'size': f"0x{p_size:X}",
-                'flags': f"0x{flags:X}"
+                'offset': p_offset,
+                'size': p_size,
+                'flags': flags
             })
 
-            offset += 32
-
         return partitions
 
-    def get_partition_type(self, p_type):
+    @staticmethod
+    def get_partition_type(p_type):
         """Convert partition type byte to string"""
-        types = {
-            0x00: 'app',
-            0x01: 'data',
-        }
-        return types.get(p_type, f'0x{p_type:02X}')
+        return PARTITION_TYPES.get(p_type, f'0x{p_type:02X}')
 
-    def get_partition_subtype(self, p_type, p_subtype):
+    @staticmethod
+    def get_partition_subtype(p_type, p_subtype):
         """Convert partition subtype to string"""
-        if p_type == 0x00:  # app
-            subtypes = {
-                0x00: 'factory',
-                0x10: 'ota_0',
-                0x11: 'ota_1',
-                0x12: 'ota_2',
-                0x13: 'ota_3',
-                0x20: 'test',
-            }
-        elif p_type == 0x01:  # data
-            subtypes = {
-                0x00: 'ota',
-                0x01: 'phy',
-                0x02: 'nvs',
-                0x03: 'coredump',
-                0x04: 'nvs_keys',
-                0x05: 'efuse',
-                0x80: 'esphttpd',
-                0x81: 'fat',
-                0x82: 'spiffs',
-            }
-        else:
-            return f'0x{p_subtype:02X}'
-
-        return subtypes.get(p_subtype, f'0x{p_subtype:02X}')
+        return PARTITION_SUBTYPES.get(p_type, {}).get(p_subtype, f'0x{p_subtype:02X}')
 
     # ------------------------------------------------------------------
     #  GUI creation (modified layout)
@@ -343,6 +565,7 @@ class ESP32SPIFFSManager:
 
         ttk.Label(conn_frame, text="COM Port:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
         self.port_var = tk.StringVar()
+        self.port_var.trace_add("write", self.on_port_changed)
         self.port_combo = ttk.Combobox(conn_frame, textvariable=self.port_var, state="readonly", width=15)
         self.port_combo.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 5))
 
@@ -367,9 +590,7 @@ class ESP32SPIFFSManager:
             state="readonly",
             width=40,                # made wider as requested
         )
-        partition_names = [
-            f"{p['name']} (0x{p['offset']:X}, {p['size']} B)" for p in self.spiffs_partitions
-        ]
+        partition_names = [p['label'] for p in self.spiffs_partitions]
         self.partition_combo['values'] = partition_names
         if partition_names:  # Only set current if there are partitions
             self.partition_combo.current(self.current_spiffs_index)
@@ -432,6 +653,18 @@ class ESP32SPIFFSManager:
         self.progress = ttk.Progressbar(action_frame, mode='indeterminate', length=200)
         self.progress.grid(row=0, column=1, padx=(10, 0))
 
+        # Status bar
+        self.status_var = tk.StringVar(value="Ready")
+        status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
+        status_bar.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+
+        # File list + editor are only usable after a download; built on first load_files()
+        self.main_frame = main_frame
+
+    def create_content_widgets(self):
+        """Build the file list and editor (row 3 of the main frame)."""
+        main_frame = self.main_frame
+
         # ---------------- Content frame ----------------
         content_frame = ttk.Frame(main_frame)
         content_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -483,34 +716,29 @@ class ESP32SPIFFSManager:
             wrap=tk.WORD,
             width=50,
             height=20,
-            state="normal"
+            state="normal",
+            undo=True,
+            maxundo=EDITOR_MAX_UNDO,
+            autoseparators=True
         )
         self.content_editor.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        self.content_editor.bind('<KeyRelease>', self.on_content_changed)
-
-        # Status bar
-        self.status_var = tk.StringVar(value="Ready")
-        status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        # <<Modified>> fires once when Tk's modified flag is set, not on every key
+        self.content_editor.bind('<<Modified>>', self.on_content_changed)
+        self.content_built = True
 
     # ------------------------------------------------------------------
     #  Dependency / connection / scan helpers (unchanged)
     # ------------------------------------------------------------------
     def check_dependencies(self):
-        required_files = ["esptool.exe", "mkspiffs_espressif32_arduino.exe"]
-        missing_files = []
-        for file in required_files:
-            if not os.path.exists(file):
-                missing_files.append(file)
+        # same lookup the tools are run with: local copy first, then PATH
+        missing_files = [file for file in REQUIRED_FILES if not os.path.isfile(resolve_tool(file))]
         if missing_files:
             message = "Missing required files:\n" + "\n".join(f"- {file}" for file in missing_files)
-            message += "\n\nPlease ensure these files are in the application directory."
+            message += "\n\nPlease ensure these files are in the application directory or on PATH."
             messagebox.showerror("Missing Dependencies", message)
             self.status_var.set("Missing dependencies")
             return False
-        try:
-            import serial.tools.list_ports
-        except ImportError:
+        if not HAVE_PYSERIAL:
             messagebox.showerror("Missing Library", "pyserial library not found!\nPlease install it using: pip install pyserial")
             self.status_var.set("Missing pyserial")
             return False
@@ -518,85 +746,109 @@ class ESP32SPIFFSManager:
         return True
 
     def scan_ports(self):
-        ports = serial.tools.list_ports.comports()
-        port_list = []
-        for port in ports:
-            description = port.description if port.description != 'n/a' else 'Unknown device'
-            port_display = f"{port.device} - {description}"
-            port_list.append(port_display)
-        self.port_combo['values'] = port_list
-        if self.config.get("last_port"):
-            for port_display in port_list:
-                if port_display.startswith(self.config["last_port"] + " "):
-                    self.port_var.set(port_display)
-                    break
-        elif port_list:
-            self.port_var.set(port_list[0])
-        self.status_var.set(f"Found {len(port_list)} COM ports")
+        """Enumerate COM ports off the Tk thread; reuse a scan younger than PORT_SCAN_CACHE_SEC."""
+        scanned_at, by_device = self.ports_cache
+        if by_device is not None and time.monotonic() - scanned_at < PORT_SCAN_CACHE_SEC:
+            self.apply_ports(by_device)
+            return
+        self.status_var.set("Scanning COM ports...")
+        self.scan_btn.state(['disabled'])
+        worker = threading.Thread(target=self.scan_ports_worker, daemon=True)
+        worker.start()
+        # the Tk thread picks the result up itself: root.after from a worker fails when
+        # the main loop isn't running yet (e.g. the startup dependency messagebox)
+        self.root.after(PORT_SCAN_POLL_MS, self.poll_port_scan, worker)
+
+    def scan_ports_worker(self):
+        """Fill ports_cache with the current ports; touches no Tk state."""
+        by_device = {}
+        try:
+            ports = comports()
+            # likely ESP32 boards first (stable sort), so the default pick is a plausible device
+            ports = sorted(ports, key=lambda port: not is_esp_port(port))
+            # device → "COM5 - description" display string
+            by_device = {
+                port.device: f"{port.device} - {port.description if port.description != 'n/a' else 'Unknown device'}"
+                for port in ports
+            }
+        except Exception as e:
+            print(f"Error scanning COM ports: {e}")
+        self.ports_cache = (time.monotonic(), by_device)
+
+    def poll_port_scan(self, worker):
+        if worker.is_alive():
+            self.root.after(PORT_SCAN_POLL_MS, self.poll_port_scan, worker)
+            return
+        self.apply_ports(self.ports_cache[1] or {})
+
+    def apply_ports(self, by_device):
+        # port selection stays locked while connecting/connected
+        if not self.port_combo.instate(['disabled']):
+            self.scan_btn.state(['!disabled'])
+        port_list = list(by_device.values())
+        # same ports as shown: leave the combobox and the user's pick alone
+        if by_device != self.shown_ports:
+            self.shown_ports = by_device
+            self.port_combo['values'] = port_list
+            last_port = self.config.get("last_port")
+            if last_port in by_device:
+                self.port_var.set(by_device[last_port])
+            elif port_list:
+                self.port_var.set(port_list[0])
+        # don't overwrite a status set meanwhile (e.g. by check_dependencies)
+        if self.status_var.get() in ("Ready", "Scanning COM ports..."):
+            self.status_var.set(f"Found {len(port_list)} COM ports")
+
+    def on_port_changed(self, *args):
+        self.selected_device = self.port_var.get().split(" - ")[0]
 
     def get_selected_port(self):
-        port_display = self.port_var.get()
-        if not port_display:
-            return ""
-        return port_display.split(" - ")[0]
+        # plain attribute read: safe and cheap from worker threads
+        return self.selected_device
 
     # ------------------------------------------------------------------
     #  NEW:  on disconnect reset button to initial state + clear file list & editor
     # ------------------------------------------------------------------
     def toggle_connection(self):
         if not self.connected:
-            if not self.port_var.get():
+            port = self.get_selected_port()
+            if not port:
                 messagebox.showerror("Error", "Please select a COM port")
                 return
 
-            try:
-                # Read partition table from ESP32
-                self.status_var.set("Reading partition table...")
-                self.root.update()
-
-                spiffs_partitions = self.read_partition_table_from_esp32()
-
-                # Update internal state with new partitions
-                self.spiffs_partitions = spiffs_partitions
-                self.current_spiffs_index = 0
-
-                # Update UI with new partition data
-                self.update_partition_combo()
-
-                # Connection considered successful
-                self.connected = True
-                self.connect_btn.config(text="Disconnect")
-                self.action_btn.config(state="normal")
-
-                # Enable partition combo when connected
-                self.partition_combo.state(['!disabled'])
-
-                self.config["last_port"] = self.get_selected_port()
-                self.save_config()
-                self.status_var.set(f"Connected to {self.get_selected_port()} ({self.chip_var.get()})")
-
-            except Exception as e:
-                messagebox.showerror("Connection Error", f"Could not read partition table:\n{e}")
-                self.status_var.set("Connection failed")
-                return
+            # Read partition table from ESP32 off the Tk thread; the port is fixed
+            # here and the selection locked so it can't change under the worker
+            self.esp_port = port
+            self.status_var.set("Reading partition table...")
+            self.connect_btn.state(['disabled'])
+            self.port_combo.state(['disabled'])
+            self.scan_btn.state(['disabled'])
+            self.io_pool.submit(self.connect_worker)
 
         else:
             # ---------- disconnect ----------
             self.connected = False
+            # queued behind any running download/upload so the port isn't pulled from under it
+            self.io_pool.submit(self.close_esp)
             self.connect_btn.config(text="Connect")
             self.action_btn.config(state="disabled")
             # reset big button to initial download state
             self.spiffs_downloaded = False
             self.action_btn.config(text="Download SPIFFS")
             # clear file list and editor
-            self.file_listbox.delete(0, tk.END)
-            self.content_editor.delete(1.0, tk.END)
             self.current_files.clear()
+            self.file_cache.clear()
+            self.sniff_cache.clear()
+            self.file_index.clear()
             self.selected_file = None
-            self.editor_modified = False
-            self.save_file_btn.config(state="disabled")
-            self.delete_file_btn.config(state="disabled")
-            self.add_file_btn.config(state="disabled")
+            if self.content_built:
+                self.file_listbox.delete(0, tk.END)
+                self.content_editor.delete(1.0, tk.END)
+                self.content_editor.edit_reset()
+                self.content_editor.edit_modified(False)
+                self.save_file_btn.config(state="disabled")
+                self.delete_file_btn.config(state="disabled")
+                self.add_file_btn.config(state="disabled")
             # unlock COM port UI
             self.port_combo.state(['!disabled'])
             self.scan_btn.state(['!disabled'])
@@ -608,11 +860,54 @@ class ESP32SPIFFSManager:
             self.chip_display_entry.state(['disabled'])
             self.status_var.set("Disconnected")
 
+    def connect_worker(self):
+        try:
+            chip_description, spiffs_partitions = self.read_partition_table_from_esp32()
+        except Exception as e:
+            error_msg = str(e)
+            self.root.after(0, lambda: self.connection_error(error_msg))
+            return
+        self.root.after(0, lambda: self.connection_ready(chip_description, spiffs_partitions))
+
+    def connection_ready(self, chip_description, spiffs_partitions):
+        # Extract base chip type
+        chip_model = self.extract_chip_model(chip_description)
+        print(f"Extracted chip model: {chip_model}")
+        self.chip_var.set(chip_model)
+        self.config["esp32_chip"] = chip_model
+        self.chip_display_var.set(chip_description)
+
+        # Update internal state with new partitions
+        self.spiffs_partitions = spiffs_partitions
+        self.current_spiffs_index = 0
+
+        # Update UI with new partition data
+        self.update_partition_combo()
+
+        # Connection considered successful
+        self.connected = True
+        self.connect_btn.state(['!disabled'])
+        self.connect_btn.config(text="Disconnect")
+        self.action_btn.config(state="normal")
+
+        # Enable partition combo when connected
+        self.partition_combo.state(['!disabled'])
+
+        port = self.esp_port
+        self.config["last_port"] = port
+        self.save_config()
+        self.status_var.set(f"Connected to {port} ({chip_model})")
+
+    def connection_error(self, error_msg):
+        self.connect_btn.state(['!disabled'])
+        self.port_combo.state(['!disabled'])
+        self.scan_btn.state(['!disabled'])
+        messagebox.showerror("Connection Error", f"Could not read partition table:\n{error_msg}")
+        self.status_var.set("Connection failed")
+
     def update_partition_combo(self):
         """Update the partition combo box with current partitions"""
-        partition_names = [
-            f"{p['name']} (0x{p['offset']:X}, {p['size']} B)" for p in self.spiffs_partitions
-        ]
+        partition_names = [p['label'] for p in self.spiffs_partitions]
         self.partition_combo['values'] = partition_names
         if partition_names:  # Only set current if there are partitions
             self.partition_combo.current(self.current_spiffs_index)
@@ -636,8 +931,8 @@ class ESP32SPIFFSManager:
             self.size_var.set("")
             return
         part = self.spiffs_partitions[self.current_spiffs_index]
-        self.offset_var.set(self.format_value_for_display(part['offset']))
-        self.size_var.set(self.format_value_for_display(part['size']))
+        self.offset_var.set(part['offset_hex'])
+        self.size_var.set(part['size_hex'])
 
     def save_spiffs_config(self):
         # The configuration is now derived from ESP32 partition table
@@ -664,63 +959,52 @@ class ESP32SPIFFSManager:
             self.upload_spiffs()
 
     def download_spiffs(self):
+        self.start_busy("Downloading SPIFFS...")
+        # snapshot the selected partition on the Tk thread; the worker only uses the local
+        part = self.spiffs_partitions[self.current_spiffs_index]
+
         def download_worker():
             try:
-                self.progress.start()
-                self.action_btn.config(state="disabled")
-                self.status_var.set("Downloading SPIFFS...")
-
-                # Use the values from the selected partition
-                part = self.spiffs_partitions[self.current_spiffs_index]
                 offset_val = part['offset']
                 size_val   = part['size']
 
-                offset_hex = f"0x{offset_val:X}"
-                size_dec   = str(size_val)
-
-                cmd = [
-                    "esptool.exe",
-                    "--chip", self.chip_var.get(),
-                    "--port", self.get_selected_port(),
-                    "--baud", self.config["baud_rate"],
-                    "read_flash", offset_hex, size_dec,
-                    "spiffs_dump.bin"
-                ]
+                # drop any previous dump so a failed read can't leave stale data behind
+                Path("spiffs_dump.bin").unlink(missing_ok=True)
 
-                print(f"Executing command: {' '.join(cmd)}")
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                print(f"esptool return code: {result.returncode}")
-                if result.stdout:
-                    print(f"esptool stdout: {result.stdout}")
-                if result.stderr:
-                    print(f"esptool stderr: {result.stderr}")
+                # clear the data folder while the (UART-bound) flash read runs
+                cleanup = threading.Thread(target=self.reset_data_dir, daemon=True)
+                cleanup.start()
 
-                if result.returncode != 0:
-                    error_msg = result.stderr if result.stderr else "Unknown error"
-                    raise Exception(f"Failed to read flash: {error_msg}")
+                # read over the connection opened at Connect instead of spawning esptool
+                last_pct = None
+                def report(done, total):
+                    nonlocal last_pct
+                    pct = done * 100 // total
+                    if pct != last_pct:
+                        last_pct = pct
+                        self.root.after(0, self.show_progress, pct)
 
-                data_dir = Path("data")
-                data_dir.mkdir(exist_ok=True)
-                for file in data_dir.glob("*"):
-                    if file.is_file():
-                        file.unlink()
+                print(f"Reading flash at {part['offset_hex']}, size {part['size_hex']}...")
+                try:
+                    data = self.open_esp().read_flash(offset_val, size_val, report)
+                except Exception as e:
+                    # drop the connection so the next attempt reconnects cleanly
+                    self.close_esp()
+                    raise Exception(f"Failed to read flash: {e}")
+                finally:
+                    cleanup.join()
+                with open("spiffs_dump.bin", "wb") as f:
+                    f.write(data)
 
                 cmd = [
-                    "mkspiffs_espressif32_arduino.exe",
+                    self.mkspiffs_exe,
                     "-u", "data",
                     "spiffs_dump.bin"
                 ]
 
-                print(f"Executing command: {' '.join(cmd)}")
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                print(f"mkspiffs return code: {result.returncode}")
-                if result.stdout:
-                    print(f"mkspiffs stdout: {result.stdout}")
-                if result.stderr:
-                    print(f"mkspiffs stderr: {result.stderr}")
-
-                if result.returncode != 0:
-                    error_msg = result.stderr if result.stderr else "Unknown error"
+                returncode, output = self.run_tool(cmd, "mkspiffs")
+                if returncode != 0:
+                    error_msg = output if output else "Unknown error"
                     raise Exception(f"Failed to extract SPIFFS: {error_msg}")
 
                 self.root.after(0, self.download_complete)
@@ -730,12 +1014,55 @@ class ESP32SPIFFSManager:
                 print(f"Download error: {error_msg}")
                 self.root.after(0, lambda msg=error_msg: self.download_error(msg))
 
-        thread = threading.Thread(target=download_worker)
-        thread.daemon = True
-        thread.start()
+        self.io_pool.submit(download_worker)
 
-    def download_complete(self):
+    @staticmethod
+    def reset_data_dir():
+        """Empty the local data folder that mkspiffs unpacks into."""
+        data_dir = Path("data")
+        shutil.rmtree(data_dir, ignore_errors=True)
+        data_dir.mkdir(exist_ok=True)
+
+    def run_tool(self, cmd, label):
+        """Run an external tool, streaming its output and feeding "(NN %)" progress
+        to the progress bar. Returns (return code, last lines of output)."""
+        print(f"Executing command: {' '.join(cmd)}")
+        tail = deque(maxlen=TOOL_OUTPUT_TAIL_LINES)
+        last_pct = None
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, bufsize=1, **SUBPROCESS_KWARGS) as proc:
+            for line in proc.stdout:
+                line = line.rstrip()
+                if not line:
+                    continue
+                print(f"{label}: {line}")
+                tail.append(line)
+                match = PROGRESS_RE.search(line)
+                if match and match.group(1) != last_pct:
+                    last_pct = match.group(1)
+                    self.root.after(0, self.show_progress, int(last_pct))
+        print(f"{label} return code: {proc.returncode}")
+        return proc.returncode, "\n".join(tail)
+
+    def start_busy(self, status):
+        """Lock the action button and animate the bar until real progress arrives
+        (called on the Tk thread, before the worker is submitted)."""
+        self.action_btn.config(state="disabled")
+        self.status_var.set(status)
+        self.progress.start(PROGRESS_INTERVAL_MS)
+
+    def show_progress(self, percent):
+        if str(self.progress['mode']) != 'determinate':
+            self.progress.stop()
+            self.progress.config(mode='determinate', maximum=100)
+        self.progress['value'] = percent
+
+    def reset_progress(self):
         self.progress.stop()
+        self.progress.config(mode='indeterminate', value=0)
+
+    def download_complete(self):
+        self.reset_progress()
         self.action_btn.config(state="normal", text="Upload SPIFFS")
         self.spiffs_downloaded = True
         self.status_var.set("SPIFFS downloaded successfully")
@@ -748,28 +1075,55 @@ class ESP32SPIFFSManager:
         messagebox.showinfo("Success", "SPIFFS downloaded successfully!")
 
     def download_error(self, error_msg):
-        self.progress.stop()
+        self.reset_progress()
         self.action_btn.config(state="normal")
         self.status_var.set("Download failed")
         messagebox.showerror("Download Error", f"Failed to download SPIFFS:\n{error_msg}")
 
+    def write_flash_image(self, offset, image, progress_fn=None):
+        """Compress and write image at offset over the open connection, then verify
+        its MD5 (same sequence as esptool write_flash -z, without argv parsing)."""
+        from esptool.loader import DEFAULT_TIMEOUT, ERASE_WRITE_TIMEOUT_PER_MB, timeout_per_mb
+
+        esp = self.open_esp()
+        compressed = zlib.compress(image, 9)
+        decompress = zlib.decompressobj()
+        blocks = esp.flash_defl_begin(len(image), len(compressed), offset)
+        timeout = DEFAULT_TIMEOUT
+        for seq in range(blocks):
+            block = compressed[seq * esp.FLASH_WRITE_SIZE:(seq + 1) * esp.FLASH_WRITE_SIZE]
+            # the stub ACKs a block on receipt and writes it while the next one arrives,
+            # so each block is sent with the timeout of the one before it
+            block_timeout = max(DEFAULT_TIMEOUT,
+                                timeout_per_mb(ERASE_WRITE_TIMEOUT_PER_MB,
+                                               len(decompress.decompress(block))))
+            esp.flash_defl_block(block, seq, timeout=timeout)
+            timeout = block_timeout
+            if progress_fn:
+                progress_fn(seq + 1, blocks)
+        # not ACKed until the last block is actually in flash
+        esp.read_reg(esp.CHIP_DETECT_MAGIC_REG_ADDR, timeout=timeout)
+
+        if esp.flash_md5sum(offset, len(image)) != hashlib.md5(image).hexdigest():
+            raise Exception("MD5 of image does not match data in flash")
+        esp.flash_begin(0, 0)
+        esp.flash_defl_finish(False)
+
     def upload_spiffs(self):
+        self.start_busy("Creating SPIFFS image...")
+        # snapshot the selected partition on the Tk thread; the worker only uses the local
+        part = self.spiffs_partitions[self.current_spiffs_index]
+
         def upload_worker():
             try:
-                self.progress.start()
-                self.action_btn.config(state="disabled")
-                self.status_var.set("Creating SPIFFS image...")
-
                 spiffs_dir = Path("spiffs")
                 spiffs_dir.mkdir(exist_ok=True)
+                (spiffs_dir / "data.bin").unlink(missing_ok=True)
 
-                # Use the values from the selected partition
-                part = self.spiffs_partitions[self.current_spiffs_index]
                 size_val   = part['size']
-                offset_val = part['offset']
 
                 cmd = [
-                    "mkspiffs_espressif32_arduino.exe",
+                    self.mkspiffs_exe,
                     "-c", "data",
                     "-p", "256",
                     "-b", "4096",
@@ -777,45 +1131,34 @@ class ESP32SPIFFSManager:
                     "spiffs/data.bin"
                 ]
 
-                print(f"Executing command: {' '.join(cmd)}")
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                print(f"mkspiffs create return code: {result.returncode}")
-                if result.stdout:
-                    print(f"mkspiffs create stdout: {result.stdout}")
-                if result.stderr:
-                    print(f"mkspiffs create stderr: {result.stderr}")
-
-                if result.returncode != 0:
-                    error_msg = result.stderr if result.stderr else "Unknown error"
+                returncode, output = self.run_tool(cmd, "mkspiffs create")
+                if returncode != 0:
+                    error_msg = output if output else "Unknown error"
                     raise Exception(f"Failed to create SPIFFS image: {error_msg}")
 
                 self.root.after(0, lambda: self.status_var.set("Uploading to ESP32..."))
 
-                offset_hex = f"0x{offset_val:X}"
-                cmd = [
-                    "esptool.exe",
-                    "--chip", self.chip_var.get(),
-                    "--port", self.get_selected_port(),
-                    "--baud", self.config["baud_rate"],
-                    "--before", "default_reset",
-                    "--after", "hard_reset",
-                    "write_flash", "-z",
-                    "--flash_mode", "dio",
-                    "--flash_size", "detect",
-                    offset_hex, "spiffs/data.bin"
-                ]
+                with open(spiffs_dir / "data.bin", "rb") as f:
+                    image = f.read()
 
-                print(f"Executing command: {' '.join(cmd)}")
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                print(f"esptool write return code: {result.returncode}")
-                if result.stdout:
-                    print(f"esptool write stdout: {result.stdout}")
-                if result.stderr:
-                    print(f"esptool write stderr: {result.stderr}")
+                last_pct = None
+                def report(done, total):
+                    nonlocal last_pct
+                    pct = done * 100 // total
+                    if pct != last_pct:
+                        last_pct = pct
+                        self.root.after(0, self.show_progress, pct)
 
-                if result.returncode != 0:
-                    error_msg = result.stderr if result.stderr else "Unknown error"
-                    raise Exception(f"Failed to upload SPIFFS: {error_msg}")
+                print(f"Writing {len(image)} bytes at {part['offset_hex']}...")
+                try:
+                    self.write_flash_image(part['offset'], image, report)
+                    # reboot into the application, as esptool --after hard_reset did
+                    self.esp.hard_reset()
+                except Exception as e:
+                    raise Exception(f"Failed to upload SPIFFS: {e}")
+                finally:
+                    # the chip has reset (or failed); reconnect on the next operation
+                    self.close_esp()
 
                 self.root.after(0, self.upload_complete)
 
@@ -824,54 +1167,59 @@ class ESP32SPIFFSManager:
                 print(f"Upload error: {error_msg}")
                 self.root.after(0, lambda msg=error_msg: self.upload_error(msg))
 
-        thread = threading.Thread(target=upload_worker)
-        thread.daemon = True
-        thread.start()
+        self.uploading = True
+        self.io_pool.submit(upload_worker)
 
     def upload_complete(self):
-        self.progress.stop()
+        self.uploading = False
+        self.reset_progress()
         self.action_btn.config(state="normal")
         self.status_var.set("SPIFFS uploaded successfully")
         messagebox.showinfo("Success", "SPIFFS uploaded successfully!")
+        self.finish_pending_close()
 
     def upload_error(self, error_msg):
-        self.progress.stop()
+        self.uploading = False
+        self.reset_progress()
         self.action_btn.config(state="normal")
         self.status_var.set("Upload failed")
         messagebox.showerror("Upload Error", f"Failed to upload SPIFFS:\n{error_msg}")
+        self.finish_pending_close()
 
     # ------------------------------------------------------------------
-    #  File management (adjusted for editor_modified flag, full file list)
+    #  File management (editor modified flag, full file list)
     # ------------------------------------------------------------------
     def load_files(self):
+        if not self.content_built:
+            self.create_content_widgets()
         self.current_files = {}
+        self.file_cache.clear()
+        self.sniff_cache.clear()
+        self.selected_file = None     # force the editor to reload after a new download
         self.file_listbox.delete(0, tk.END)
         data_dir = Path("data")
         if not data_dir.exists():
             return
-        # we now list *all* files; only read as text when possible
-        file_paths = list(data_dir.iterdir())
+        # we now list *all* files; contents are read when a file is selected.
+        # scandir entries carry the file type (and on Windows the stat data),
+        # so no extra stat call per file is needed
+        with os.scandir(data_dir) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                    self.current_files[entry.name] = (st.st_size, st.st_mtime_ns)
+                except OSError as e:
+                    print(f"Error reading {entry.path}: {e}")
+                    self.current_files[entry.name] = (0, 0)
 
-        print(f"Loading {len(file_paths)} files from data directory")
+        print(f"Loaded {len(self.current_files)} files from data directory")
 
-        for file_path in file_paths:
-            if file_path.is_file():
-                filename = file_path.name
-                try:
-                    if file_path.suffix.lower() in self.text_extensions:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                        print(f"Loaded text file: {filename} ({len(content)} chars)")
-                    else:
-                        # binary or unknown – keep empty placeholder
-                        content = ""
-                        print(f"Loaded binary file: {filename} (empty content)")
-                    self.current_files[filename] = content
-                    self.file_listbox.insert(tk.END, filename)
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-                    self.current_files[filename] = f"[Error reading file: {e}]"
-                    self.file_listbox.insert(tk.END, filename)
+        # one Tcl call for the whole list instead of one per file
+        if self.current_files:
+            self.file_listbox.insert(tk.END, *self.current_files)
+        self.file_index = {name: i for i, name in enumerate(self.current_files)}
 
         # keep add‑file button enabled after a successful download
         if self.spiffs_downloaded:
@@ -886,63 +1234,155 @@ class ESP32SPIFFSManager:
         else:
             print("No files found in data directory")
 
+    def load_file_content(self, filename):
+        """Return the text of a data file, reading it on first use (LRU cached)."""
+        if filename in self.file_cache:
+            self.file_cache.move_to_end(filename)
+            return self.file_cache[filename]
+        file_path = Path("data") / filename
+        try:
+            # one raw read + decode instead of a TextIOWrapper
+            fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+            try:
+                raw = os.read(fd, os.fstat(fd).st_size)
+            finally:
+                os.close(fd)
+            content = raw.decode('utf-8')
+            if '\r' in content:
+                content = content.replace('\r\n', '\n')
+            print(f"Loaded text file: {filename} ({len(content)} chars)")
+        except Exception as e:
+            print(f"Error reading {file_path}: {e}")
+            return f"[Error reading file: {e}]"
+        self.cache_file_content(filename, content)
+        return content
+
+    def is_probably_text(self, filename):
+        """Check the first bytes of a file for NULs / invalid UTF-8 before decoding it all."""
+        mtime = self.current_files.get(filename, (0, 0))[1]
+        cached = self.sniff_cache.get(filename)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(Path("data") / filename, 'rb') as f:
+                head = f.read(TEXT_SNIFF_BYTES)
+            # incremental decoder tolerates a multi-byte character cut at the end
+            is_text = b'\x00' not in head
+            if is_text:
+                codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        except UnicodeDecodeError:
+            is_text = False
+        except OSError:
+            is_text = True              # let load_file_content report the error
+        self.sniff_cache[filename] = (mtime, is_text)
+        return is_text
+
+    def cache_file_content(self, filename, content):
+        self.file_cache[filename] = content
+        self.file_cache.move_to_end(filename)
+        while len(self.file_cache) > FILE_CACHE_SIZE or (
+                len(self.file_cache) > 1
+                and sum(map(len, self.file_cache.values())) > FILE_CACHE_MAX_CHARS):
+            self.file_cache.popitem(last=False)
+
     # NEW:  ask unsaved when changing file selection
     def on_file_select(self, event=None):
         selection = self.file_listbox.curselection()
         if not selection:
             return
+        filename = self.file_listbox.get(selection[0])
+        # re-selecting the file already shown unchanged: skip the editor rebuild
+        if filename == self.selected_file and not self.content_editor.edit_modified():
+            return
         if not self.ask_unsaved_changes("switching file"):
             # restore previous selection
-            idx = list(self.current_files.keys()).index(self.selected_file) if self.selected_file else 0
+            idx = self.file_index.get(self.selected_file, 0)
             self.file_listbox.selection_clear(0, tk.END)
             self.file_listbox.selection_set(idx)
             return
 
-        filename = self.file_listbox.get(selection[0])
         print(f"Selected file: {filename}")
         if filename in self.current_files:
             self.selected_file = filename
             # Determine if this file type is editable
-            if filename.lower().endswith(tuple(self.text_extensions)):
+            if (filename.lower().endswith(TEXT_EXTENSIONS)
+                    and self.is_probably_text(filename)):
                 # Editable text file
-                content = self.current_files[filename]
+                content = self.load_file_content(filename)
                 self.content_editor.config(state="normal")
-                self.content_editor.delete(1.0, tk.END)
-                self.content_editor.insert(1.0, content)
-                self.editor_modified = False
+                self.set_editor_text(content)
+                self.content_editor.edit_modified(False)
                 self.save_file_btn.config(state="disabled")
                 self.delete_file_btn.config(state="normal")
             else:
                 # Not editable – show notice and disable editing
                 notice = "File type not supported for editing."
                 self.content_editor.config(state="normal")
-                self.content_editor.delete(1.0, tk.END)
-                self.content_editor.insert(1.0, notice)
+                self.set_editor_text(notice)
                 self.content_editor.config(state="disabled")
-                self.editor_modified = False
+                self.content_editor.edit_modified(False)
                 self.save_file_btn.config(state="disabled")
                 self.delete_file_btn.config(state="normal")
 
+    def set_editor_text(self, new):
+        """Replace the editor text, touching only the part after the common prefix."""
+        old = self.content_editor.get('1.0', 'end-1c')
+        if old == new:
+            self.content_editor.edit_reset()
+            return
+        limit = min(len(old), len(new))
+        # compare in blocks first, then narrow down to the first differing char
+        p = 0
+        while p < limit and old[p:p + 4096] == new[p:p + 4096]:
+            p += 4096
+        p = min(p, limit)
+        end = min(p + 4096, limit)
+        while p < end and old[p] == new[p]:
+            p += 1
+        # a Python offset is only a valid Tk index if the prefix is all BMP
+        if NON_BMP_RE.search(new, 0, p):
+            p = 0
+        # one Tcl call instead of delete + insert; with undo off while loading, Tk
+        # doesn't copy the whole file into an undo record only to discard it below
+        self.content_editor.config(undo=False)
+        self.content_editor.replace(f'1.0+{p}c', 'end-1c', new[p:])
+        self.content_editor.config(undo=True)
+        # a freshly loaded file starts with no undo history (and frees the old one)
+        self.content_editor.edit_reset()
+
     def on_content_changed(self, event=None):
+        if not self.content_editor.edit_modified():
+            return                      # flag was just reset by load/save
         if self.selected_file and self.content_editor['state'] == 'normal':
-            self.editor_modified = True
             self.save_file_btn.config(state="normal")
 
     def save_current_file(self):
         if not self.selected_file:
             return
-        if not self.selected_file.lower().endswith(tuple(self.text_extensions)):
+        if not self.selected_file.lower().endswith(TEXT_EXTENSIONS):
             messagebox.showerror("Error", "Cannot save this file type (read‑only).")
             return
-        content = self.content_editor.get(1.0, tk.END).rstrip()
-        self.current_files[self.selected_file] = content
+        # 'end-1c' skips the newline Tk always appends; only strip again if needed
+        content = self.content_editor.get('1.0', 'end-1c')
+        if content[-1:].isspace():
+            content = content.rstrip()
+        # same text as on disk (the cache holds what was last loaded/saved): skip the rewrite
+        if self.file_cache.get(self.selected_file) == content:
+            self.content_editor.edit_modified(False)
+            self.save_file_btn.config(state="disabled")
+            self.status_var.set(f"No changes to save in {self.selected_file}")
+            return
         try:
             data_dir = Path("data")
             data_dir.mkdir(exist_ok=True)
             file_path = data_dir / self.selected_file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            self.editor_modified = False
+            # encode once, raw write: no newline translation, LF line endings as on the ESP32;
+            # written to a temp file and renamed so a failed save keeps the old file
+            st = replace_file_bytes(file_path, content.encode('utf-8'))
+            # only cache once it is on disk, or a failed save would look unchanged
+            self.cache_file_content(self.selected_file, content)
+            self.current_files[self.selected_file] = (st.st_size, st.st_mtime_ns)
+            self.content_editor.edit_modified(False)
             self.save_file_btn.config(state="disabled")
             self.status_var.set(f"Saved {self.selected_file}")
         except Exception as e:
@@ -961,27 +1401,22 @@ class ESP32SPIFFSManager:
             messagebox.showerror("Error", f'File "{filename}" already exists in the SPIFFS.')
             return
 
-        try:
-            with open(src_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not read selected file:\n{e}")
-            return
-
-        # Register in internal structures and write to disk
-        self.current_files[filename] = content
-        self.file_listbox.insert(tk.END, filename)
-
+        # Copy to disk and register in internal structures; content is read
+        # lazily by load_file_content (which also normalises line endings)
         data_dir = Path("data")
         data_dir.mkdir(exist_ok=True)
         dest_path = data_dir / filename
         try:
-            with open(dest_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            shutil.copyfile(src_path, dest_path)
+            st = dest_path.stat()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to copy file to data folder:\n{e}")
             return
 
+        self.current_files[filename] = (st.st_size, st.st_mtime_ns)
+        self.file_index[filename] = len(self.file_index)
+        self.file_listbox.insert(tk.END, filename)
+
         self.file_listbox.selection_clear(0, tk.END)
         self.file_listbox.selection_set(tk.END)
         self.on_file_select()
@@ -994,6 +1429,9 @@ class ESP32SPIFFSManager:
         if not result:
             return
         del self.current_files[self.selected_file]
+        self.file_cache.pop(self.selected_file, None)
+        self.sniff_cache.pop(self.selected_file, None)
+        self.file_index = {name: i for i, name in enumerate(self.current_files)}
         selection = self.file_listbox.curselection()
         if selection:
             self.file_listbox.delete(selection[0])
@@ -1004,8 +1442,9 @@ class ESP32SPIFFSManager:
         except Exception as e:
             print(f"Error deleting file: {e}")
         self.content_editor.delete(1.0, tk.END)
+        self.content_editor.edit_reset()
         self.selected_file = None
-        self.editor_modified = False
+        self.content_editor.edit_modified(False)
         self.save_file_btn.config(state="disabled")
         self.delete_file_btn.config(state="disabled")
         self.content_editor.config(state="normal")   # re‑enable for next selection
@@ -1014,16 +1453,35 @@ class ESP32SPIFFSManager:
     #  Application close handler
     # ------------------------------------------------------------------
     def on_app_closing(self):
-        if self.ask_unsaved_changes("closing the application"):
-            self.root.destroy()
+        if self.close_pending or not self.ask_unsaved_changes("closing the application"):
+            return
+        # flashing runs in this process: closing the port mid-write would leave the
+        # partition half-written, so a running upload is allowed to finish first
+        if self.uploading:
+            if messagebox.askyesno("Upload in Progress",
+                                   "SPIFFS is still being written to the ESP32.\n"
+                                   "Close the application when the upload has finished?"):
+                self.close_pending = True
+                self.status_var.set("Closing when the upload finishes...")
+            return
+        self.close_app()
+
+    def finish_pending_close(self):
+        """Close the window if that was deferred until the upload finished."""
+        if self.close_pending:
+            self.close_app()
+
+    def close_app(self):
+        self.io_pool.shutdown(wait=False, cancel_futures=True)
+        self.close_esp()
+        self.flush_config()
+        self.root.destroy()
 
 
 # ----------------------------------------------------------------------
 #  Entry-point
 # ----------------------------------------------------------------------
 def main():
-    import tkinter.simpledialog
-    tk.simpledialog = tkinter.simpledialog
     root = tk.Tk()
     ESP32SPIFFSManager(root)
     root.mainloop()